@@ -1,227 +1,474 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import smtplib
+from string import Template
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+import io
+import json
+import pickle
+import functools
+import heapq
+from collections import Counter
+import requests
+from curl_cffi import requests as curl_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 
+# Bars of history a ticker needs before it's screened
+MIN_HISTORY_DAYS = 25
+
+# Number of threads used for network fetches (price download, company info)
+MAX_WORKERS = 16
+# Tickers per yf.download batch (keeps each batch's failures and memory contained)
+DOWNLOAD_CHUNK_SIZE = 100
+
+# On-disk cache for data that rarely changes (constituents, company info)
+CACHE_DIR = '.cache'
+TICKERS_TTL = timedelta(days=30)
+INFO_TTL = timedelta(days=7)
+# Only for quick local re-runs - bars from an intraday run stay in the cache
+# for this long, so CI keeps price_history.pkl out of its restored .cache
+HISTORY_TTL = timedelta(hours=1)
+
+# Shared HTTP session so repeated requests reuse the same connection
+session = requests.Session()
+# Add headers to avoid being blocked as a bot
+session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+# Keep a pool of connections alive and retry rate limits/server errors with backoff
+session.mount('https://', HTTPAdapter(
+    pool_connections=MAX_WORKERS,
+    pool_maxsize=2 * MAX_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# One browser-impersonating session (the kind yfinance creates by default) shared
+# by every yfinance call - otherwise each yf.download call builds a new one and
+# pays a fresh TLS handshake and cookie/crumb fetch
+yf_session = curl_requests.Session(impersonate='chrome')
+
+class FileCache:
+    """Store JSON values on disk and expire them after a time-to-live"""
+    
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, key, ttl):
+        """Return the cached value, or None if missing, unreadable or expired"""
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+            fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        except (OSError, ValueError, KeyError):
+            return None
+        
+        if datetime.now() - fetched_at > ttl:
+            return None
+        return entry['value']
+    
+    def set(self, key, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # Write to a temp file first so a crash never leaves a half-written entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': datetime.now().isoformat(), 'value': value}, f)
+        os.replace(tmp_path, path)
+
+cache = FileCache()
+
+def cached(key, ttl):
+    """
+    Cache a function's result on disk for ttl
+    Positional arguments are appended to the key (e.g. ticker_info_AAPL)
+    Failures aren't cached - exceptions propagate to the caller
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            full_key = '_'.join([key] + [str(arg) for arg in args])
+            value = cache.get(full_key, ttl)
+            if value is None:
+                value = func(*args)
+                cache.set(full_key, value)
+            return value
+        return wrapper
+    return decorator
+
+@functools.lru_cache(maxsize=1)
+@cached('sp500_tickers', ttl=TICKERS_TTL)
 def get_sp500_tickers():
     """Get list of S&P 500 tickers"""
     # Using a Wikipedia table to get S&P 500 tickers
     url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
     
-    # Add headers to avoid being blocked as a bot
-    import requests
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
-    
-    tables = pd.read_html(requests.get(url, headers=headers).content)
+    # Parse only the constituents table with lxml's C parser
+    response = session.get(url, timeout=15)
+    response.raise_for_status()
+    tables = pd.read_html(io.StringIO(response.text), flavor='lxml', attrs={'id': 'constituents'})
     sp500_table = tables[0]
     tickers = sp500_table['Symbol'].tolist()
     # Clean up tickers (remove dots, etc.)
     tickers = [ticker.replace('.', '-') for ticker in tickers]
     return tickers
 
-def check_bullish_engulfing(ticker):
+def download_history(tickers):
     """
-    Check if a ticker shows bullish engulfing pattern with 3+ red days prior
-    Returns signal details if pattern found, None otherwise
+    Download 60 days of OHLCV data for all tickers in batched requests
+    Returns one DataFrame with (ticker, field) columns
+    """
+    frames = []
+    # Chunks run one after another: each call already fetches its tickers on
+    # MAX_WORKERS threads, and overlapping calls would share yfinance's
+    # process-wide thread limit and its save/restore of hide_exceptions
+    for start in range(0, len(tickers), DOWNLOAD_CHUNK_SIZE):
+        chunk = tickers[start:start + DOWNLOAD_CHUNK_SIZE]
+        # yf.download logs and swallows most per-ticker network errors itself (those
+        # tickers come back empty/all-NaN and are reported below); this only catches
+        # a request error that escapes it, leaving the whole chunk out
+        try:
+            frames.append(yf.download(
+                chunk,
+                period='60d',
+                group_by='ticker',
+                threads=MAX_WORKERS,
+                progress=False,
+                auto_adjust=True,  # Same adjusted prices Ticker.history() returned
+                timeout=15,
+                session=yf_session
+            ))
+        except (curl_requests.exceptions.RequestException, requests.RequestException) as e:
+            print(f"Error downloading {chunk[0]}..{chunk[-1]}: {str(e)}")
+            continue
+        print(f"Progress: {start + len(chunk)}/{len(tickers)} tickers downloaded...")
+    
+    if not frames:
+        print("ERROR: Every price history download failed")
+        return pd.DataFrame(columns=pd.MultiIndex.from_product([[], []]))
+    
+    all_data = pd.concat(frames, axis=1)
+    
+    missing = missing_tickers(all_data, tickers)
+    if missing:
+        print(f"No price data for {len(missing)} ticker(s): {', '.join(missing)}")
+    
+    return all_data
+
+def load_history(tickers):
     """
+    Get price history for all tickers, reusing the last download if it's recent
+    (re-runs for debugging skip the network). The whole universe is stored as
+    one pickle rather than a file per ticker
+    """
+    path = os.path.join(cache.cache_dir, 'price_history.pkl')
+    cached_data = None
     try:
-        # Get 60 days of data to have enough history
-        stock = yf.Ticker(ticker)
-        df = stock.history(period='60d')
-        
-        if len(df) < 25:  # Need enough data
-            return None
-        
-        # Calculate 20-day and 50-day moving averages
-        df['MA_20'] = df['Close'].rolling(window=20).mean()
-        df['MA_50'] = df['Close'].rolling(window=50).mean()
-        
-        # Calculate Average True Range (ATR) for volatility
-        df['H-L'] = df['High'] - df['Low']
-        df['H-PC'] = abs(df['High'] - df['Close'].shift(1))
-        df['L-PC'] = abs(df['Low'] - df['Close'].shift(1))
-        df['TR'] = df[['H-L', 'H-PC', 'L-PC']].max(axis=1)
-        df['ATR'] = df['TR'].rolling(window=14).mean()
-        
-        # Calculate average volume (20-day)
-        df['Avg_Volume'] = df['Volume'].rolling(window=20).mean()
-        
-        # Look at the last 5 days (need 3+ red, then engulfing)
-        recent = df.tail(5)
-        
-        if len(recent) < 5:
-            return None
-        
-        # Check last 4 days for red candles (close < open)
-        days_before_last = recent.iloc[:-1]
-        red_days = (days_before_last['Close'] < days_before_last['Open']).sum()
-        
-        if red_days < 3:
-            return None
-        
-        # Check if last day is bullish engulfing
-        last_day = recent.iloc[-1]
-        prev_day = recent.iloc[-2]
-        
-        # Bullish engulfing conditions:
-        # 1. Opens below previous close
-        # 2. Closes above previous open
-        # 3. Body engulfs previous candle
-        is_bullish_engulfing = (
-            last_day['Open'] < prev_day['Close'] and
-            last_day['Close'] > prev_day['Open'] and
-            last_day['Close'] > last_day['Open']  # Confirm it's a green candle
-        )
-        
-        if not is_bullish_engulfing:
-            return None
-        
-        # Calculate signal metrics
-        body_size_pct = ((last_day['Close'] - last_day['Open']) / last_day['Open']) * 100
-        volume_ratio = last_day['Volume'] / last_day['Avg_Volume']
-        
-        # Debug: Print near-misses
-        if body_size_pct >= 0.8 and volume_ratio >= 1.1:
-            print(f"  Near miss - {ticker}: body={body_size_pct:.2f}%, vol={volume_ratio:.2f}x")
-        
-        # Check if minimum criteria met - relaxed for real market conditions
-        if body_size_pct < 0.8 or volume_ratio < 1.10:
-            return None
-        
-        # Distance from 50-day MA
-        current_price = last_day['Close']
-        ma_50 = last_day['MA_50']
-        distance_from_ma = ((current_price - ma_50) / ma_50) * 100 if pd.notna(ma_50) else -999
-        
-        # Calculate rating (1-5 stars)
-        rating = calculate_rating(body_size_pct, volume_ratio, distance_from_ma)
-        
-        # Calculate targets and stops
-        atr = last_day['ATR']
-        entry_price = current_price
-        
-        # Multiple targets for quick exits
-        target_1r = entry_price + (1.5 * atr)  # Quick 1.5R target (3-5 days)
-        target_2r = entry_price + (2.5 * atr)  # Extended 2.5R target (5-10 days)
-        
-        stop_loss = last_day['Low'] - (1.5 * atr)  # Below engulfing low with buffer
-        
-        # Calculate weekly resistance (approximate using recent highs)
-        weekly_high = df.tail(20)['High'].max()
-        
-        # Get option expiration suggestions (1-2 weeks out for quick trades)
-        today = datetime.now()
-        exp_dates = get_option_expirations(today)
-        
-        # Suggest strike prices (emphasize ATM for quick moves)
-        strikes = suggest_strikes(current_price, target_1r)
-        
-        # Calculate expected profit % if target hit in 3 days
-        expected_profit = calculate_expected_profit(current_price, target_1r)
-        
+        age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(path))
+        if age < HISTORY_TTL:
+            cached_data = pd.read_pickle(path)
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError) as e:
+        # Truncated or corrupt pickle, or one written by an incompatible pandas
+        print(f"Ignoring unreadable price history cache: {str(e)}")
+    
+    # Column names alone aren't enough - failed tickers come back as empty columns
+    if cached_data is not None and not missing_tickers(cached_data, tickers):
+        print("Using cached price history...")
+        return cached_data
+    
+    all_data = download_history(tickers)
+    
+    # Only keep complete downloads - a re-run should retry failed tickers, not reuse the gaps
+    if not missing_tickers(all_data, tickers):
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        all_data.to_pickle(path)
+    return all_data
+
+# OHLCV fields read by screen_patterns (High/Low are only needed per signal).
+# Price comparisons run on float32 over the full history; the body size and
+# volume thresholds only read the last RATIO_DAYS bars, kept in float64
+SCREEN_FIELDS = ['Open', 'Close']
+RATIO_FIELDS = ['Open', 'Close', 'Volume']
+RATIO_DAYS = 20
+
+def stack_ohlcv(all_data, tickers, fields=SCREEN_FIELDS, dtype=np.float32):
+    """
+    Stack the batched download into one (n_tickers, n_days) array per field
+    Rows follow the order of tickers; missing tickers/days are NaN
+    float32 (the default) halves memory traffic and is exact enough to compare
+    two cent prices, but not to test a ratio against a threshold - pass
+    dtype=np.float64 for those so the screen agrees with detect_pattern
+    """
+    # One MultiIndex reindex pulls every (ticker, field) column in a single copy,
+    # then reorder to (field, ticker, day) so each field's rows are contiguous
+    columns = pd.MultiIndex.from_product([tickers, fields])
+    block = all_data.reindex(columns=columns).to_numpy(dtype=dtype)
+    block = block.reshape(len(all_data), len(tickers), len(fields))
+    block = np.ascontiguousarray(block.transpose(2, 1, 0))
+    return {field: block[i] for i, field in enumerate(fields)}
+
+def missing_tickers(all_data, tickers):
+    """Tickers with no Close data in the download (failed, delisted or absent)"""
+    close_arr = stack_ohlcv(all_data, tickers, ['Close'])['Close']
+    has_data = (~np.isnan(close_arr)).any(axis=1)
+    return [ticker for ticker, ok in zip(tickers, has_data) if not ok]
+
+def screen_patterns(arrays, recent):
+    """
+    Run the bullish engulfing screen for every ticker at once
+    arrays holds the float32 SCREEN_FIELDS history, recent the float64
+    RATIO_FIELDS for the last RATIO_DAYS bars (both from stack_ohlcv)
+    Returns a dict of boolean masks (one entry per ticker) for each criterion
+    """
+    open_arr, close_arr = arrays['Open'], arrays['Close']
+    n_tickers, n_days = close_arr.shape
+    
+    # Too few bars overall (e.g. the download failed) - no ticker can qualify,
+    # and the slices below would index past the start of the arrays
+    if n_days < MIN_HISTORY_DAYS:
+        no_tickers = np.zeros(n_tickers, dtype=bool)
         return {
-            'ticker': ticker,
-            'company_name': company_name,
-            'sector': sector,
-            'description': business_summary,
-            'rating': rating,
-            'current_price': round(current_price, 2),
-            'entry_price': round(entry_price, 2),
-            'target_quick': round(target_1r, 2),  # 1.5R for 3-5 day exit
-            'target_extended': round(target_2r, 2),  # 2.5R if holding longer
-            'stop_loss': round(stop_loss, 2),
-            'weekly_resistance': round(weekly_high, 2),
-            'body_size_pct': round(body_size_pct, 2),
-            'volume_ratio': round(volume_ratio, 2),
-            'distance_from_ma50': round(distance_from_ma, 1),
-            'atr': round(atr, 2),
-            'exp_dates': exp_dates,
-            'suggested_strikes': strikes,
-            'expected_profit_pct': expected_profit,
-            'engulfing_low': round(last_day['Low'], 2),
-            'date': last_day.name.strftime('%Y-%m-%d')
+            'enough_data': no_tickers,
+            'red_days': no_tickers,
+            'engulfing': no_tickers,
+            'body_size': no_tickers,
+            'volume': no_tickers
         }
-        
-    except Exception as e:
-        print(f"Error processing {ticker}: {str(e)}")
+    
+    # 3+ red candles in the 4 days before the last one
+    red_days = (close_arr[:, -5:-1] < open_arr[:, -5:-1]).sum(axis=1)
+    
+    # Same engulfing conditions as detect_pattern, on the last two columns
+    engulfing = (
+        (open_arr[:, -1] < close_arr[:, -2]) &
+        (close_arr[:, -1] > open_arr[:, -2]) &
+        (close_arr[:, -1] > open_arr[:, -1])
+    )
+    
+    # Thresholds decide which tickers reach detect_pattern, so they use the
+    # same float64 values it does - float32 rounding flips borderline cases
+    last_open, last_close = recent['Open'][:, -1], recent['Close'][:, -1]
+    vol_arr = recent['Volume']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        body_size_pct = ((last_close - last_open) / last_open) * 100
+        volume_ratio = vol_arr[:, -1] / vol_arr.mean(axis=1)
+    
+    return {
+        'enough_data': (~np.isnan(close_arr)).sum(axis=1) >= MIN_HISTORY_DAYS,
+        'red_days': red_days >= 3,
+        'engulfing': engulfing,
+        'body_size': body_size_pct >= 0.8,
+        'volume': volume_ratio >= 1.10
+    }
+
+def detect_pattern(ticker, df, exp_dates):
+    """
+    Check if a ticker shows bullish engulfing pattern with 3+ red days prior
+    Takes the ticker's pre-fetched OHLCV DataFrame (see download_history) and
+    the option expirations for this scan (shared by every signal)
+    Returns numerical signal details if pattern found, None otherwise
+    (company details are added later by enrich_with_info)
+    """
+    if len(df) < MIN_HISTORY_DAYS:  # Need enough data
+        return None
+    
+    # Work on raw arrays indexed with slices (no per-row pandas access).
+    # The pattern test only needs Open/Close - the rest is pulled if it passes
+    open_ = df['Open'].to_numpy()
+    close = df['Close'].to_numpy()
+    
+    # Check the 4 days before the last one for red candles (close < open)
+    red_days = (close[-5:-1] < open_[-5:-1]).sum()
+    
+    if red_days < 3:
+        return None
+    
+    # Bullish engulfing conditions (last day vs the day before):
+    # 1. Opens below previous close
+    # 2. Closes above previous open
+    # 3. Body engulfs previous candle
+    is_bullish_engulfing = (
+        open_[-1] < close[-2] and
+        close[-1] > open_[-2] and
+        close[-1] > open_[-1]  # Confirm it's a green candle
+    )
+    
+    if not is_bullish_engulfing:
+        return None
+    
+    # Indicators are only needed for tickers showing the pattern, and only their
+    # latest values are used, so compute scalars from the raw arrays
+    high = df['High'].to_numpy()
+    low = df['Low'].to_numpy()
+    volume = df['Volume'].to_numpy()
+    
+    # Calculate average volume (20-day)
+    avg_volume = volume[-20:].mean()
+    
+    # Calculate signal metrics
+    body_size_pct = ((close[-1] - open_[-1]) / open_[-1]) * 100
+    volume_ratio = volume[-1] / avg_volume
+    
+    # Debug: Print near-misses
+    if body_size_pct >= 0.8 and volume_ratio >= 1.1:
+        print(f"  Near miss - {ticker}: body={body_size_pct:.2f}%, vol={volume_ratio:.2f}x")
+    
+    # Check if minimum criteria met - relaxed for real market conditions
+    if body_size_pct < 0.8 or volume_ratio < 1.10:
         return None
+    
+    # 50-day moving average (NaN until there are 50 days of history)
+    ma_50 = close[-50:].mean() if len(close) >= 50 else np.nan
+    
+    # Average True Range (ATR) for volatility
+    atr = calculate_atr(high, low, close)
+    
+    # Distance from 50-day MA
+    current_price = close[-1]
+    distance_from_ma = ((current_price - ma_50) / ma_50) * 100 if pd.notna(ma_50) else -999
+    
+    # Calculate rating (1-5 stars)
+    rating = calculate_rating(body_size_pct, volume_ratio, distance_from_ma)
+    
+    # Calculate targets and stops
+    entry_price = current_price
+    
+    # Multiple targets for quick exits
+    target_1r = entry_price + (1.5 * atr)  # Quick 1.5R target (3-5 days)
+    target_2r = entry_price + (2.5 * atr)  # Extended 2.5R target (5-10 days)
+    
+    stop_loss = low[-1] - (1.5 * atr)  # Below engulfing low with buffer
+    
+    # Calculate weekly resistance (approximate using recent highs)
+    weekly_high = high[-20:].max()
+    
+    # Suggest strike prices (emphasize ATM for quick moves)
+    strikes = suggest_strikes(current_price, target_1r)
+    
+    # Calculate expected profit % if target hit in 3 days
+    expected_profit = calculate_expected_profit(current_price, target_1r)
+    
+    return {
+        'ticker': ticker,
+        'rating': rating,
+        'current_price': round(current_price, 2),
+        'entry_price': round(entry_price, 2),
+        'target_quick': round(target_1r, 2),  # 1.5R for 3-5 day exit
+        'target_extended': round(target_2r, 2),  # 2.5R if holding longer
+        'stop_loss': round(stop_loss, 2),
+        'weekly_resistance': round(weekly_high, 2),
+        'body_size_pct': round(body_size_pct, 2),
+        'volume_ratio': round(volume_ratio, 2),
+        'distance_from_ma50': round(distance_from_ma, 1),
+        'atr': round(atr, 2),
+        'exp_dates': exp_dates,
+        'suggested_strikes': strikes,
+        'expected_profit_pct': expected_profit,
+        'engulfing_low': round(low[-1], 2),
+        'date': df.index[-1].strftime('%Y-%m-%d')
+    }
+
+def calculate_atr(high, low, close, period=14):
+    """
+    Latest Average True Range using Wilder's smoothing (RMA), the ATR
+    definition used by TradingView/TA-Lib. Equivalent to
+    TR.ewm(alpha=1/period, adjust=False).mean().iloc[-1]
+    """
+    # Plain ndarray slices line up bars with the previous close (no index alignment)
+    cur_high, cur_low, prev_close = high[1:], low[1:], close[:-1]
+    true_range = np.maximum.reduce([
+        cur_high - cur_low,
+        np.abs(cur_high - prev_close),
+        np.abs(cur_low - prev_close)
+    ])
+    
+    # The first bar has no previous close, so its true range is just high - low
+    true_range = np.concatenate(([high[0] - low[0]], true_range))
+    
+    # Unrolled recurrence atr += (tr - atr) / period: each bar's weight decays by
+    # (1 - 1/period) per newer bar, and the seed bar keeps the leftover weight
+    alpha = 1 / period
+    weights = alpha * (1 - alpha) ** np.arange(len(true_range) - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (len(true_range) - 1)
+    return float(np.dot(weights, true_range))
+
+@cached('ticker_info', ttl=INFO_TTL)
+def get_company_info(ticker):
+    """Get the display fields we use from Yahoo's info endpoint"""
+    info = yf.Ticker(ticker, session=yf_session).info
+    return {
+        'company_name': info.get('longName', ticker),
+        'sector': info.get('sector', 'Unknown'),
+        'description': info.get('longBusinessSummary', 'No description available.')
+    }
+
+def enrich_with_info(signal):
+    """Add company name, sector and description to a signal"""
+    # .info is a slow scrape, so it's only fetched for tickers that passed the screen
+    try:
+        signal.update(get_company_info(signal['ticker']))
+    except Exception as e:
+        print(f"Error fetching info for {signal['ticker']}: {str(e)}")
+        signal.update({
+            'company_name': signal['ticker'],
+            'sector': 'Unknown',
+            'description': 'No description available.'
+        })
+    return signal
+
+# Rating lookup tables: score for each band between consecutive thresholds
+VOLUME_THRESHOLDS = np.array([1.1, 1.2, 1.3, 1.5])
+VOLUME_SCORES = np.array([0, 0.5, 1, 1.5, 2])  # max 2 points
+BODY_THRESHOLDS = np.array([0.8, 1.0, 1.5, 2.5])
+BODY_SCORES = np.array([0, 0.5, 1, 1.5, 2])  # max 2 points
+MA_THRESHOLDS = np.array([-20, -15, -10])  # distance must be strictly above these
+MA_SCORES = np.array([0, 0.4, 0.7, 1])  # max 1 point
+RATING_THRESHOLDS = np.array([1.5, 2.5, 3.5, 4.5])  # total score for 2-5 stars
 
 def calculate_rating(body_size_pct, volume_ratio, distance_from_ma):
-    """Calculate 1-5 star rating based on signal strength"""
-    score = 0
-    
-    # Volume scoring (max 2 points)
-    if volume_ratio >= 1.5:
-        score += 2
-    elif volume_ratio >= 1.3:
-        score += 1.5
-    elif volume_ratio >= 1.2:
-        score += 1
-    elif volume_ratio >= 1.1:
-        score += 0.5
-    
-    # Body size scoring (max 2 points)
-    if body_size_pct >= 2.5:
-        score += 2
-    elif body_size_pct >= 1.5:
-        score += 1.5
-    elif body_size_pct >= 1.0:
-        score += 1
-    elif body_size_pct >= 0.8:
-        score += 0.5
-    
-    # Distance from MA50 scoring (max 1 point)
-    if distance_from_ma > -10:
-        score += 1
-    elif distance_from_ma > -15:
-        score += 0.7
-    elif distance_from_ma > -20:
-        score += 0.4
+    """
+    Calculate 1-5 star rating based on signal strength
+    Accepts scalars or NumPy arrays (rates all candidates in one call)
+    """
+    score = (
+        VOLUME_SCORES[np.searchsorted(VOLUME_THRESHOLDS, volume_ratio, side='right')] +
+        BODY_SCORES[np.searchsorted(BODY_THRESHOLDS, body_size_pct, side='right')] +
+        MA_SCORES[np.searchsorted(MA_THRESHOLDS, distance_from_ma, side='left')]
+    )
     
     # Convert to 1-5 scale
-    if score >= 4.5:
-        return 5
-    elif score >= 3.5:
-        return 4
-    elif score >= 2.5:
-        return 3
-    elif score >= 1.5:
-        return 2
-    else:
-        return 1
+    rating = np.searchsorted(RATING_THRESHOLDS, score, side='right') + 1
+    return int(rating) if np.ndim(rating) == 0 else rating
 
 def get_option_expirations(today):
     """Generate suggested option expiration dates (1-2 weeks out for quick trades)"""
-    expirations = []
+    # Next Friday (a week out if today is Friday), then stride by a week
+    days_until_friday = (4 - today.weekday()) % 7 or 7
+    first_friday = today + timedelta(days=days_until_friday)
+    fridays = [first_friday + timedelta(days=7 * i) for i in range(2)]
     
-    # Find next Fridays within 7-14 days (optimal for 3-4 day holds)
-    days_ahead = 0
-    while len(expirations) < 4:
-        days_ahead += 1
-        future_date = today + timedelta(days=days_ahead)
-        
-        # Check if it's a Friday and within 1-2 week range
-        if future_date.weekday() == 4:  # Friday
-            days_diff = (future_date - today).days
-            if 3 <= days_diff <= 14:  # 1-2 weeks out
-                expirations.append(future_date.strftime('%Y-%m-%d'))
-    
-    return expirations[:2]  # Return top 2 (next 2 Fridays)
+    # Keep Fridays within 3-14 days (optimal for 3-4 day holds)
+    return [friday.strftime('%Y-%m-%d') for friday in fridays if 3 <= (friday - today).days <= 14]
+
+# Strike increment lookup: under $50, $50-200, $200 and up. Plain numbers so
+# whole-dollar strikes stay ints in the email ($105, not $105.0)
+STRIKE_PRICE_THRESHOLDS = np.array([50, 200])
+STRIKE_INCREMENTS = (2.5, 5, 10)
 
 def suggest_strikes(current_price, target_price):
     """Suggest option strike prices (emphasize ATM for quick moves)"""
-    # Round to nearest $2.50 or $5 depending on price
-    if current_price < 50:
-        increment = 2.5
-    elif current_price < 200:
-        increment = 5
-    else:
-        increment = 10
+    # Round to nearest $2.50, $5 or $10 depending on price
+    increment = STRIKE_INCREMENTS[np.searchsorted(STRIKE_PRICE_THRESHOLDS, current_price, side='right')]
     
     atm_strike = round(current_price / increment) * increment
     itm_strike = atm_strike - increment
@@ -243,105 +490,93 @@ def calculate_expected_profit(entry_price, target_price):
     
     return round(option_profit_estimate, 1)
 
-def format_email_body(signals):
-    """Format the signals into an HTML email"""
-    
-    if not signals:
-        return "<html><body><h2>No bullish engulfing signals found today.</h2></body></html>"
-    
-    # Sort by rating (highest first)
-    signals_sorted = sorted(signals, key=lambda x: x['rating'], reverse=True)
-    
-    # Group by sector to show trends
-    sectors = {}
-    for signal in signals_sorted:
-        sector = signal['sector']
-        if sector not in sectors:
-            sectors[sector] = 0
-        sectors[sector] += 1
-    
-    sector_summary = ", ".join([f"{sector} ({count})" for sector, count in sorted(sectors.items(), key=lambda x: x[1], reverse=True)])
-    
-    html = """
+# Stylesheet for the signals email (static, so defined once)
+EMAIL_CSS = """
+    body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; }
+    .signal { 
+        border: 2px solid #ddd; 
+        margin: 15px 0; 
+        padding: 12px; 
+        border-radius: 8px;
+        background-color: #f9f9f9;
+    }
+    .rating-5 { border-color: #FFD700; background-color: #FFFACD; }
+    .rating-4 { border-color: #87CEEB; background-color: #F0F8FF; }
+    .rating-3 { border-color: #90EE90; background-color: #F0FFF0; }
+    .header { background-color: #4CAF50; color: white; padding: 10px; border-radius: 5px; }
+    .stars { color: #FFD700; font-size: 20px; display: inline; }
+    .company-info { background-color: #f0f0f0; padding: 8px; border-radius: 5px; margin: 8px 0; font-size: 13px; }
+    .metrics { display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin: 10px 0; font-size: 13px; }
+    .metric { background-color: white; padding: 6px; border-radius: 4px; }
+    .metric-label { font-weight: bold; color: #666; font-size: 11px; }
+    .metric-value { color: #333; font-size: 14px; }
+    .targets { background-color: #E8F5E9; padding: 10px; border-radius: 5px; margin: 10px 0; }
+    .options { background-color: #E3F2FD; padding: 10px; border-radius: 5px; margin: 10px 0; font-size: 13px; }
+    h1 { color: #333; margin: 10px 0; font-size: 24px; }
+    h2 { color: #4CAF50; margin: 5px 0; font-size: 18px; display: inline; }
+    h3 { color: #333; margin: 10px 0 5px 0; font-size: 14px; }
+    .sector-badge { background-color: #666; color: white; padding: 3px 8px; border-radius: 3px; font-size: 11px; }
+    .quick-exit { font-weight: bold; color: #2E7D32; }
+"""
+
+# Email header (CSS included), filled in once per email
+EMAIL_HEADER_TEMPLATE = Template("""
     <html>
     <head>
-        <style>
-            body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; }
-            .signal { 
-                border: 2px solid #ddd; 
-                margin: 15px 0; 
-                padding: 12px; 
-                border-radius: 8px;
-                background-color: #f9f9f9;
-            }
-            .rating-5 { border-color: #FFD700; background-color: #FFFACD; }
-            .rating-4 { border-color: #87CEEB; background-color: #F0F8FF; }
-            .rating-3 { border-color: #90EE90; background-color: #F0FFF0; }
-            .header { background-color: #4CAF50; color: white; padding: 10px; border-radius: 5px; }
-            .stars { color: #FFD700; font-size: 20px; display: inline; }
-            .company-info { background-color: #f0f0f0; padding: 8px; border-radius: 5px; margin: 8px 0; font-size: 13px; }
-            .metrics { display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin: 10px 0; font-size: 13px; }
-            .metric { background-color: white; padding: 6px; border-radius: 4px; }
-            .metric-label { font-weight: bold; color: #666; font-size: 11px; }
-            .metric-value { color: #333; font-size: 14px; }
-            .targets { background-color: #E8F5E9; padding: 10px; border-radius: 5px; margin: 10px 0; }
-            .options { background-color: #E3F2FD; padding: 10px; border-radius: 5px; margin: 10px 0; font-size: 13px; }
-            h1 { color: #333; margin: 10px 0; font-size: 24px; }
-            h2 { color: #4CAF50; margin: 5px 0; font-size: 18px; display: inline; }
-            h3 { color: #333; margin: 10px 0 5px 0; font-size: 14px; }
-            .sector-badge { background-color: #666; color: white; padding: 3px 8px; border-radius: 3px; font-size: 11px; }
-            .quick-exit { font-weight: bold; color: #2E7D32; }
-        </style>
+        <style>""" + EMAIL_CSS + """</style>
     </head>
     <body>
         <div class="header">
-            <h1>📈 Bullish Engulfing Signals - """ + datetime.now().strftime('%B %d, %Y') + """</h1>
+            <h1>📈 Bullish Engulfing Signals - $date</h1>
         </div>
-        <p><strong>""" + str(len(signals)) + """</strong> signal(s) found | <strong>Sectors:</strong> """ + sector_summary + """</p>
+        <p><strong>$count</strong> signal(s) found | <strong>Sectors:</strong> $sector_summary</p>
+    """)
+
+EMAIL_FOOTER = """
+        <hr>
+        <p style="color: #666; font-size: 11px; margin-top: 20px;">
+            <strong>Disclaimer:</strong> This is automated technical analysis for educational purposes. 
+            Not financial advice. Always do your own research and consult with a financial advisor.
+        </p>
+    </body>
+    </html>
     """
-    
-    for signal in signals_sorted:
-        stars = '⭐' * signal['rating']
-        rating_class = f"rating-{signal['rating']}"
-        
-        # Calculate risk/reward
-        risk_pct = round(((signal['entry_price']/signal['stop_loss'])-1)*100, 1)
-        quick_reward_pct = round(((signal['target_quick']/signal['entry_price'])-1)*100, 1)
-        
-        html += f"""
-        <div class="signal {rating_class}">
-            <h2>{signal['ticker']} - {signal['company_name']}</h2>
-            <div class="stars">{stars}</div>
-            <span class="sector-badge">{signal['sector']}</span>
+
+# Per-signal email block, parsed once and filled in for each signal
+SIGNAL_TEMPLATE = Template("""
+        <div class="signal $rating_class">
+            <h2>$ticker - $company_name</h2>
+            <div class="stars">$stars</div>
+            <span class="sector-badge">$sector</span>
             
             <div class="company-info">
-                {signal['description']}
+                $description
             </div>
             
             <div class="metrics">
                 <div class="metric">
                     <div class="metric-label">CURRENT PRICE</div>
-                    <div class="metric-value">${signal['current_price']}</div>
+                    <div class="metric-value">$$${current_price}</div>
                 </div>
                 <div class="metric">
                     <div class="metric-label">ATR (14-DAY)</div>
-                    <div class="metric-value">${signal['atr']}</div>
+                    <div class="metric-value">$$${atr}</div>
                 </div>
                 <div class="metric">
                     <div class="metric-label">BODY SIZE</div>
-                    <div class="metric-value">{signal['body_size_pct']}%</div>
+                    <div class="metric-value">${body_size_pct}%</div>
                 </div>
                 <div class="metric">
                     <div class="metric-label">VOLUME RATIO</div>
-                    <div class="metric-value">{signal['volume_ratio']}x avg</div>
+                    <div class="metric-value">${volume_ratio}x avg</div>
                 </div>
                 <div class="metric">
                     <div class="metric-label">vs 50-DAY MA</div>
-                    <div class="metric-value">{signal['distance_from_ma50']}%</div>
+                    <div class="metric-value">${distance_from_ma50}%</div>
                 </div>
                 <div class="metric">
                     <div class="metric-label">WEEKLY HIGH</div>
-                    <div class="metric-value">${signal['weekly_resistance']}</div>
+                    <div class="metric-value">$$${weekly_resistance}</div>
                 </div>
             </div>
             
@@ -349,65 +584,108 @@ def format_email_body(signals):
                 <h3>🎯 Trading Plan (3-5 Day Hold)</h3>
                 <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 10px; margin-top: 8px;">
                     <div>
-                        <strong>Entry:</strong> ${signal['entry_price']}
+                        <strong>Entry:</strong> $$${entry_price}
                     </div>
                     <div class="quick-exit">
-                        <strong>Target:</strong> ${signal['target_quick']} (+{quick_reward_pct}%)
+                        <strong>Target:</strong> $$${target_quick} (+${quick_reward_pct}%)
                     </div>
                     <div>
-                        <strong>Stop:</strong> ${signal['stop_loss']} (-{risk_pct}%)
+                        <strong>Stop:</strong> $$${stop_loss} (-${risk_pct}%)
                     </div>
                 </div>
                 <div style="margin-top: 8px; font-size: 12px; color: #666;">
-                    Extended target if holding longer: ${signal['target_extended']} | Risk/Reward: ~{round(quick_reward_pct/risk_pct, 1)}:1
+                    Extended target if holding longer: $$${target_extended} | Risk/Reward: ~${risk_reward}:1
                 </div>
             </div>
             
             <div class="options">
-                <h3>📝 Options (1-2 Week Exp: {', '.join(signal['exp_dates'])})</h3>
+                <h3>📝 Options (1-2 Week Exp: ${exp_dates})</h3>
                 <div style="margin-top: 5px;">
-                    <strong>⭐ Recommended ATM:</strong> ${signal['suggested_strikes']['ATM']} | 
-                    <strong>ITM:</strong> ${signal['suggested_strikes']['ITM']} | 
-                    <strong>OTM:</strong> ${signal['suggested_strikes']['OTM']}
+                    <strong>⭐ Recommended ATM:</strong> $$${atm_strike} | 
+                    <strong>ITM:</strong> $$${itm_strike} | 
+                    <strong>OTM:</strong> $$${otm_strike}
                 </div>
                 <div style="margin-top: 5px; font-size: 12px; color: #555;">
-                    Est. profit if target hit in 3-4 days: ~{signal['expected_profit_pct']}% (ATM calls)
+                    Est. profit if target hit in 3-4 days: ~${expected_profit_pct}% (ATM calls)
                 </div>
             </div>
         </div>
-        """
+        """)
+
+def format_email_body(signals):
+    """Format the signals into an HTML email"""
     
-    html += """
-        <hr>
-        <p style="color: #666; font-size: 11px; margin-top: 20px;">
-            <strong>Disclaimer:</strong> This is automated technical analysis for educational purposes. 
-            Not financial advice. Always do your own research and consult with a financial advisor.
-        </p>
-    </body>
-    </html>
-    """
+    if not signals:
+        return "<html><body><h2>No bullish engulfing signals found today.</h2></body></html>"
+    
+    # Sort by rating (highest first)
+    signals_sorted = heapq.nlargest(len(signals), signals, key=lambda x: x['rating'])
+    
+    # Group by sector to show trends
+    sector_counts = Counter(signal['sector'] for signal in signals_sorted)
+    sector_summary = ", ".join(f"{sector} ({count})" for sector, count in sector_counts.most_common())
+    
+    header_html = EMAIL_HEADER_TEMPLATE.substitute(
+        date=datetime.now().strftime('%B %d, %Y'),
+        count=len(signals),
+        sector_summary=sector_summary
+    )
+    
+    # Calculate risk/reward up front so the template below only reads locals
+    risk_rewards = [
+        (
+            round(((signal['entry_price']/signal['stop_loss'])-1)*100, 1),
+            round(((signal['target_quick']/signal['entry_price'])-1)*100, 1)
+        )
+        for signal in signals_sorted
+    ]
+    
+    # Stream the pieces into one growing buffer (avoids quadratic string +=
+    # and holding every signal block alongside the final string)
+    buf = io.StringIO()
+    buf.write(header_html)
     
-    return html
+    for signal, (risk_pct, quick_reward_pct) in zip(signals_sorted, risk_rewards):
+        stars = '⭐' * signal['rating']
+        rating_class = f"rating-{signal['rating']}"
+        
+        buf.write(SIGNAL_TEMPLATE.substitute(
+            signal,
+            stars=stars,
+            rating_class=rating_class,
+            risk_pct=risk_pct,
+            quick_reward_pct=quick_reward_pct,
+            risk_reward=round(quick_reward_pct/risk_pct, 1),
+            exp_dates=', '.join(signal['exp_dates']),
+            atm_strike=signal['suggested_strikes']['ATM'],
+            itm_strike=signal['suggested_strikes']['ITM'],
+            otm_strike=signal['suggested_strikes']['OTM']
+        ))
+    
+    buf.write(EMAIL_FOOTER)
+    return buf.getvalue()
 
-def send_email(subject, body_html, to_email, from_email, password):
-    """Send email via Gmail SMTP"""
+def send_email(subject, body_html, to_emails, from_email, password):
+    """Send email via Gmail SMTP to each recipient over a single connection"""
     try:
         msg = MIMEMultipart('alternative')
         msg['Subject'] = subject
         msg['From'] = from_email
-        msg['To'] = to_email
         
         html_part = MIMEText(body_html, 'html')
         msg.attach(html_part)
         
-        # Connect to Gmail SMTP
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(from_email, password)
-        server.send_message(msg)
-        server.quit()
+        # Connect to Gmail SMTP once - the TLS handshake and login dominate send time
+        with smtplib.SMTP('smtp.gmail.com', 587) as server:
+            server.starttls()
+            server.login(from_email, password)
+            
+            for to_email in to_emails:
+                del msg['To']
+                msg['To'] = to_email
+                server.send_message(msg)
+                print(f"Email sent successfully to {to_email}")
         
-        print(f"Email sent successfully to {to_email}")
         return True
     except Exception as e:
         print(f"Error sending email: {str(e)}")
@@ -420,7 +698,8 @@ def main():
     # Get environment variables for email
     FROM_EMAIL = os.environ.get('GMAIL_ADDRESS')
     EMAIL_PASSWORD = os.environ.get('GMAIL_APP_PASSWORD')
-    TO_EMAIL = os.environ.get('TO_EMAIL', FROM_EMAIL)  # Default to same email
+    # Comma-separated list of recipients, defaults to same email
+    TO_EMAILS = [email.strip() for email in (os.environ.get('TO_EMAIL') or FROM_EMAIL or '').split(',') if email.strip()]
     
     if not FROM_EMAIL or not EMAIL_PASSWORD:
         print("ERROR: Email credentials not set in environment variables")
@@ -442,20 +721,55 @@ def main():
         'passed_all': 0
     }
     
-    for i, ticker in enumerate(tickers):
-        if (i + 1) % 50 == 0:
-            print(f"Progress: {i + 1}/{len(tickers)} tickers scanned...")
-        
-        signal = check_bullish_engulfing(ticker)
-        pattern_stats['total_scanned'] += 1
+    # Fetch price history for the whole universe up front
+    print("Downloading price history...")
+    all_data = load_history(tickers)
+    if len(all_data) < MIN_HISTORY_DAYS:
+        print(f"WARNING: Only {len(all_data)} day(s) of price history downloaded - "
+              f"Yahoo may be unavailable. No tickers can be screened.")
+    
+    # Screen every ticker in one vectorized pass
+    masks = screen_patterns(
+        stack_ohlcv(all_data, tickers),
+        stack_ohlcv(all_data.iloc[-RATIO_DAYS:], tickers, RATIO_FIELDS, dtype=np.float64)
+    )
+    pattern = masks['enough_data'] & masks['red_days'] & masks['engulfing']
+    
+    pattern_stats['total_scanned'] = len(tickers)
+    pattern_stats['had_3_red_days'] = int((masks['enough_data'] & masks['red_days']).sum())
+    pattern_stats['had_engulfing'] = int(pattern.sum())
+    pattern_stats['failed_body_size'] = int((pattern & ~masks['body_size']).sum())
+    pattern_stats['failed_volume'] = int((pattern & ~masks['volume']).sum())
+    
+    hits = np.where(pattern & masks['body_size'] & masks['volume'])[0]
+    
+    # Get option expiration suggestions (1-2 weeks out for quick trades) once,
+    # so every signal in this scan shares the same dates
+    exp_dates = get_option_expirations(datetime.now())
+    
+    # Build full signal details only for the tickers that passed the screen.
+    # Company info (network-bound) is looked up in the background as each
+    # signal is found, overlapping with the remaining pattern work
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        info_futures = []
+        for i in hits:
+            ticker = tickers[i]
+            df = all_data[ticker].dropna()
+            signal = detect_pattern(ticker, df, exp_dates)
+            
+            if signal:
+                info_futures.append(executor.submit(enrich_with_info, signal))
+                pattern_stats['passed_all'] += 1
+                print(f"✓ Signal found: {ticker} ({signal['rating']} stars)")
         
-        if signal:
-            signals.append(signal)
-            pattern_stats['passed_all'] += 1
-            print(f"✓ Signal found: {ticker} ({signal['rating']} stars)")
+        signals = [future.result() for future in info_futures]
     
     print(f"\n=== SCAN STATISTICS ===")
     print(f"Total tickers scanned: {pattern_stats['total_scanned']}")
+    print(f"Had 3+ red days: {pattern_stats['had_3_red_days']}")
+    print(f"Had bullish engulfing: {pattern_stats['had_engulfing']}")
+    print(f"Failed body size: {pattern_stats['failed_body_size']}")
+    print(f"Failed volume: {pattern_stats['failed_volume']}")
     print(f"Signals found: {len(signals)}")
     print(f"======================\n")
     
@@ -465,7 +779,7 @@ def main():
     subject = f"📈 Bullish Engulfing Signals - {datetime.now().strftime('%B %d, %Y')} ({len(signals)} found)"
     body_html = format_email_body(signals)
     
-    send_email(subject, body_html, TO_EMAIL, FROM_EMAIL, EMAIL_PASSWORD)
+    send_email(subject, body_html, TO_EMAILS, FROM_EMAIL, EMAIL_PASSWORD)
     
     print("Done!")
 